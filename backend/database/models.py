@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, DateTime, Boolean, Index, UniqueConstraint, event, func, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-import datetime
+import orjson
+import uuid
 
 Base = declarative_base()
 
 class Problem(Base):
     __tablename__ = "problems"
+    __table_args__ = (
+        # Serves difficulty filters and lets their pages walk the index in id order
+        Index("ix_problems_diff_id", "difficulty", "id"),
+    )
     
-    id = Column(String(36), primary_key=True)
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
     difficulty = Column(String(20), nullable=False)
@@ -16,11 +21,21 @@ class Problem(Base):
     hint = Column(Text, nullable=True)
     constraints = Column(JSON, nullable=True)
     starter_code = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    # Timestamps are rendered as SQL now() in the statement rather than computed per row in Python
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now())
+    # JSON of to_dict(), precomputed at write time so reads skip re-serializing
+    serialized = Column(Text, nullable=True)
     
     # Relationships
-    examples = relationship("TestCase", back_populates="problem", cascade="all, delete-orphan")
+    examples = relationship(
+        "TestCase",
+        back_populates="problem",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="TestCase.ordinal"
+    )
+    topic_links = relationship("ProblemTopic", cascade="all, delete-orphan", passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -34,16 +49,39 @@ class Problem(Base):
             "starterCode": self.starter_code,
             "examples": [example.to_dict() for example in self.examples]
         }
+    
+    def to_summary_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "difficulty": self.difficulty,
+            "topics": self.topics
+        }
+    
+    def serialize(self):
+        """Return the problem as a JSON string, reusing the stored payload when present"""
+        return self.serialized or orjson.dumps(self.to_dict()).decode()
+
+@event.listens_for(Problem, "before_update")
+def _clear_stale_serialized(mapper, connection, target):
+    """Drop the stored payload when a problem changes without it being recomputed"""
+    if not inspect(target).attrs.serialized.history.has_changes():
+        target.serialized = None
 
 class TestCase(Base):
     __tablename__ = "test_cases"
+    __table_args__ = (
+        UniqueConstraint("problem_id", "ordinal", name="uq_test_cases_problem_ordinal"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    problem_id = Column(String(36), ForeignKey("problems.id"), nullable=False)
+    problem_id = Column(String(36), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False, index=True)
     input_data = Column(Text, nullable=False)
     output_data = Column(Text, nullable=False)
     explanation = Column(Text, nullable=True)
     is_hidden = Column(Boolean, default=False)
+    # Position within the problem's examples; the upsert key in update_problem
+    ordinal = Column(Integer, nullable=True)
     
     # Relationships
     problem = relationship("Problem", back_populates="examples")
@@ -54,4 +92,14 @@ class TestCase(Base):
             "output": self.output_data,
             "explanation": self.explanation,
             "is_hidden": self.is_hidden
-        } 
\ No newline at end of file
+        }
+
+class ProblemTopic(Base):
+    """One row per (problem, topic), so topic filters use an index instead of scanning the JSON column"""
+    __tablename__ = "problem_topics"
+    __table_args__ = (
+        Index("ix_problem_topics_topic_problem", "topic", "problem_id"),
+    )
+    
+    problem_id = Column(String(36), ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True)
+    topic = Column(String(64), primary_key=True)
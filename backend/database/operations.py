@@ -1,15 +1,137 @@
-from sqlalchemy.orm import Session
-from .models import Problem, TestCase
-import uuid
+from cachetools import TTLCache
+import orjson
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, load_only, selectinload
+from .models import Problem, ProblemTopic, TestCase
+import io
+import threading
+
+# Above this many rows, PostgreSQL (through psycopg2) loads test cases with COPY instead of INSERT
+COPY_THRESHOLD = 100
+_COPY_COLUMNS = ("problem_id", "input_data", "output_data", "explanation", "is_hidden", "ordinal")
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# Serialized problem payloads for the read-mostly endpoints, cleared on every write.
+# The generation counter stops a read that raced a write from caching stale data.
+_PROBLEM_CACHE = TTLCache(maxsize=1024, ttl=300)
+_PROBLEM_CACHE_LOCK = threading.Lock()
+_problem_cache_generation = 0
+
+def _cached(key, load):
+    """Return the cached value for key, calling load() to fill it on a miss"""
+    with _PROBLEM_CACHE_LOCK:
+        if key in _PROBLEM_CACHE:
+            return _PROBLEM_CACHE[key]
+        generation = _problem_cache_generation
+    
+    value = load()
+    if value is not None:
+        with _PROBLEM_CACHE_LOCK:
+            if generation == _problem_cache_generation:
+                _PROBLEM_CACHE[key] = value
+    return value
+
+def _invalidate_problem_cache():
+    """Drop all cached problem payloads after a write"""
+    global _problem_cache_generation
+    with _PROBLEM_CACHE_LOCK:
+        _problem_cache_generation += 1
+        _PROBLEM_CACHE.clear()
+
+def _test_case_rows(problem_id: str, examples: list):
+    """Build TestCase insert mappings for a problem's examples"""
+    return [
+        {
+            "problem_id": problem_id,
+            "input_data": example.get("input", ""),
+            "output_data": example.get("output", ""),
+            "explanation": example.get("explanation", ""),
+            "is_hidden": example.get("is_hidden", False),
+            "ordinal": ordinal
+        }
+        for ordinal, example in enumerate(examples)
+    ]
+
+def _copy_field(value):
+    """Render one value in COPY text format, where NULL is \\N and an empty field is an empty string, as with INSERT"""
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+def _copy_test_cases(db: Session, rows: list):
+    """Stream test case rows into PostgreSQL with COPY"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_field(row[column]) for column in _COPY_COLUMNS) + "\n")
+    buffer.seek(0)
+    
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY test_cases ({', '.join(_COPY_COLUMNS)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+def _insert_test_cases(db: Session, problem_id: str, examples: list):
+    """Insert all test cases for a problem in a single executemany (or COPY) round-trip"""
+    rows = _test_case_rows(problem_id, examples)
+    if not rows:
+        return
+    
+    # copy_expert is psycopg2's API; other PostgreSQL drivers use the executemany path
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2" and len(rows) > COPY_THRESHOLD:
+        _copy_test_cases(db, rows)
+    else:
+        db.execute(insert(TestCase), rows)
+
+def _upsert_test_cases(db: Session, problem_id: str, examples: list):
+    """Upsert test cases keyed on (problem_id, ordinal) and drop any leftovers"""
+    rows = _test_case_rows(problem_id, examples)
+    dialect = db.get_bind().dialect.name
+    
+    if dialect not in ("sqlite", "postgresql"):
+        # No portable UPSERT; fall back to delete and re-insert
+        db.query(TestCase).filter(TestCase.problem_id == problem_id).delete()
+        _insert_test_cases(db, problem_id, examples)
+        return
+    
+    if rows:
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(TestCase)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["problem_id", "ordinal"],
+            set_={
+                "input_data": stmt.excluded.input_data,
+                "output_data": stmt.excluded.output_data,
+                "explanation": stmt.excluded.explanation,
+                "is_hidden": stmt.excluded.is_hidden
+            }
+        )
+        db.execute(stmt, rows)
+    
+    # Remove test cases past the new end of the list (and legacy rows without an ordinal)
+    db.query(TestCase).filter(
+        TestCase.problem_id == problem_id,
+        or_(TestCase.ordinal >= len(rows), TestCase.ordinal.is_(None))
+    ).delete(synchronize_session=False)
+
+def _replace_topics(db: Session, problem_id: str, topics: list):
+    """Rewrite the problem_topics rows for a problem"""
+    db.query(ProblemTopic).filter(ProblemTopic.problem_id == problem_id).delete(synchronize_session=False)
+    rows = [{"problem_id": problem_id, "topic": topic} for topic in dict.fromkeys(topics or [])]
+    if rows:
+        db.execute(insert(ProblemTopic), rows)
+
+def _store_serialized(db: Session, db_problem: Problem):
+    """Precompute the problem's JSON payload from its current test cases"""
+    db.expire(db_problem, ["examples"])
+    db_problem.serialized = orjson.dumps(db_problem.to_dict()).decode()
 
 def create_problem(db: Session, problem_data: dict):
     """Create a new problem in the database"""
-    # Generate a UUID for the problem
-    problem_id = str(uuid.uuid4())
-    
-    # Create the problem
+    # Create the problem; its UUID comes from the column default at flush time
     db_problem = Problem(
-        id=problem_id,
         title=problem_data.get("title", ""),
         description=problem_data.get("description", ""),
         difficulty=problem_data.get("difficulty", "medium"),
@@ -19,42 +141,97 @@ def create_problem(db: Session, problem_data: dict):
         starter_code=problem_data.get("starterCode", "")
     )
     
-    # Add the problem to the database
+    # Add the problem to the database; flush so the test case FKs resolve
     db.add(db_problem)
-    db.commit()
-    db.refresh(db_problem)
+    db.flush()
+    problem_id = db_problem.id
     
     # Add test cases if provided
     if "examples" in problem_data:
-        for example in problem_data["examples"]:
-            test_case = TestCase(
-                problem_id=problem_id,
-                input_data=example.get("input", ""),
-                output_data=example.get("output", ""),
-                explanation=example.get("explanation", ""),
-                is_hidden=example.get("is_hidden", False)
-            )
-            db.add(test_case)
-        
-        db.commit()
+        _insert_test_cases(db, problem_id, problem_data["examples"])
+    _replace_topics(db, problem_id, db_problem.topics)
+    _store_serialized(db, db_problem)
     
+    # Commit the problem and its test cases in one transaction
+    db.commit()
+    _invalidate_problem_cache()
     return db_problem
 
 def get_problem(db: Session, problem_id: str):
     """Get a problem by ID"""
     return db.query(Problem).filter(Problem.id == problem_id).first()
 
-def get_all_problems(db: Session, skip: int = 0, limit: int = 100):
-    """Get all problems with pagination"""
-    return db.query(Problem).offset(skip).limit(limit).all()
+def _keyset_page(query, after_id: str = None, limit: int = 100, key=Problem.id):
+    """Return the page of rows after after_id in key order, as one indexed range scan"""
+    query = query.order_by(key)
+    if after_id:
+        query = query.filter(key > after_id)
+    return query.limit(limit).all()
 
-def get_problems_by_topic(db: Session, topic: str, skip: int = 0, limit: int = 100):
+def get_all_problems(db: Session, after_id: str = None, limit: int = 100):
+    """Get all problems with keyset pagination"""
+    query = db.query(Problem).options(selectinload(Problem.examples))
+    return _keyset_page(query, after_id, limit)
+
+def get_problems_by_topic(db: Session, topic: str, after_id: str = None, limit: int = 100):
     """Get problems by topic"""
-    return db.query(Problem).filter(Problem.topics.contains([topic])).offset(skip).limit(limit).all()
+    query = (
+        db.query(Problem)
+        .options(selectinload(Problem.examples))
+        .join(ProblemTopic, ProblemTopic.problem_id == Problem.id)
+        .filter(ProblemTopic.topic == topic)
+    )
+    # Page on the join key so the whole filter is a range scan of the (topic, problem_id) index
+    return _keyset_page(query, after_id, limit, key=ProblemTopic.problem_id)
 
-def get_problems_by_difficulty(db: Session, difficulty: str, skip: int = 0, limit: int = 100):
+def get_problems_by_difficulty(db: Session, difficulty: str, after_id: str = None, limit: int = 100):
     """Get problems by difficulty"""
-    return db.query(Problem).filter(Problem.difficulty == difficulty).offset(skip).limit(limit).all()
+    query = (
+        db.query(Problem)
+        .options(selectinload(Problem.examples))
+        .filter(Problem.difficulty == difficulty)
+    )
+    return _keyset_page(query, after_id, limit)
+
+def get_problem_json(db: Session, problem_id: str):
+    """Get a problem as a JSON string by ID, served from the cache when possible"""
+    def load():
+        problem = get_problem(db, problem_id)
+        return problem.serialize() if problem else None
+    
+    return _cached(("problem", problem_id), load)
+
+def get_problem_summaries(
+    db: Session,
+    after_id: str = None,
+    limit: int = 100,
+    topic: str = None,
+    difficulty: str = None
+):
+    """Get the list-view columns of problems with optional filtering, leaving the large text columns unloaded"""
+    query = db.query(Problem).options(
+        load_only(Problem.id, Problem.title, Problem.difficulty, Problem.topics)
+    )
+    if topic:
+        query = query.join(ProblemTopic, ProblemTopic.problem_id == Problem.id).filter(ProblemTopic.topic == topic)
+        return _keyset_page(query, after_id, limit, key=ProblemTopic.problem_id)
+    if difficulty:
+        query = query.filter(Problem.difficulty == difficulty)
+    return _keyset_page(query, after_id, limit)
+
+def get_problems_json(
+    db: Session,
+    after_id: str = None,
+    limit: int = 100,
+    topic: str = None,
+    difficulty: str = None
+):
+    """Get problem summaries as a JSON array string with optional filtering, served from the cache when possible"""
+    def load():
+        problems = get_problem_summaries(db, after_id, limit, topic=topic, difficulty=difficulty)
+        return orjson.dumps([problem.to_summary_dict() for problem in problems]).decode()
+    
+    return _cached(("list", topic, difficulty, after_id, limit), load)
 
 def update_problem(db: Session, problem_id: str, problem_data: dict):
     """Update a problem"""
@@ -69,30 +246,24 @@ def update_problem(db: Session, problem_id: str, problem_data: dict):
     
     # Update test cases if provided
     if "examples" in problem_data:
-        # Delete existing test cases
-        db.query(TestCase).filter(TestCase.problem_id == problem_id).delete()
-        
-        # Add new test cases
-        for example in problem_data["examples"]:
-            test_case = TestCase(
-                problem_id=problem_id,
-                input_data=example.get("input", ""),
-                output_data=example.get("output", ""),
-                explanation=example.get("explanation", ""),
-                is_hidden=example.get("is_hidden", False)
-            )
-            db.add(test_case)
+        _upsert_test_cases(db, problem_id, problem_data["examples"])
+    if "topics" in problem_data:
+        _replace_topics(db, problem_id, db_problem.topics)
+    _store_serialized(db, db_problem)
     
     db.commit()
+    _invalidate_problem_cache()
     db.refresh(db_problem)
     return db_problem
 
 def delete_problem(db: Session, problem_id: str):
     """Delete a problem"""
-    db_problem = db.query(Problem).filter(Problem.id == problem_id).first()
-    if not db_problem:
-        return False
+    # Bulk-delete the children first rather than loading them for the ORM cascade;
+    # databases created before ON DELETE CASCADE was declared won't do it for us
+    db.query(TestCase).filter(TestCase.problem_id == problem_id).delete(synchronize_session=False)
+    db.query(ProblemTopic).filter(ProblemTopic.problem_id == problem_id).delete(synchronize_session=False)
+    deleted = db.query(Problem).filter(Problem.id == problem_id).delete(synchronize_session=False)
     
-    db.delete(db_problem)
     db.commit()
-    return True 
\ No newline at end of file
+    _invalidate_problem_cache()
+    return deleted > 0
@@ -1,26 +1,61 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+# Read the response body in 1 MiB chunks rather than 1 KiB
+READ_DATA_CHUNK = 1024 * 1024
+
+# Shared session so redirects (e.g. Hugging Face -> CDN) reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
 
 def download_file(url: str, filename: str):
     """
-    Download a file with a progress bar
+    Download a file with a progress bar, resuming a partial download if one exists.
+    Returns False if the file was already complete and nothing was fetched.
     """
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
+    pos = os.path.getsize(filename) if os.path.exists(filename) else 0
+    headers = {"Range": f"bytes={pos}-"} if pos else {}
+    
+    response = _SESSION.get(url, stream=True, timeout=(5, 60), headers=headers)
+    
+    # 416 means the requested range starts at (or past) the end: nothing left to fetch
+    if pos and response.status_code == 416:
+        return False
+    response.raise_for_status()
+    
+    # 200 means the server ignored the Range header, so start over from scratch
+    if response.status_code != 206:
+        pos = 0
+    total_size = pos + int(response.headers.get('content-length', 0))
     
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     
-    with open(filename, 'wb') as file, tqdm(
+    with open(filename, 'ab' if pos else 'wb') as file, tqdm(
         desc=filename,
+        initial=pos,
         total=total_size,
         unit='iB',
         unit_scale=True,
         unit_divisor=1024,
     ) as progress_bar:
-        for data in response.iter_content(chunk_size=1024):
+        # Read straight from the urllib3 stream to skip iter_content's per-chunk generator overhead
+        response.raw.decode_content = True
+        while True:
+            data = response.raw.read(READ_DATA_CHUNK)
+            if not data:
+                break
             size = file.write(data)
             progress_bar.update(size)
+    return True
 
 def main():
     # URL for the Llama 2 7B Chat model
@@ -32,8 +67,10 @@ def main():
     print("The model file is about 4GB.")
     
     try:
-        download_file(model_url, model_path)
-        print(f"\nModel downloaded successfully to {model_path}")
+        if download_file(model_url, model_path):
+            print(f"\nModel downloaded successfully to {model_path}")
+        else:
+            print(f"\nModel already present at {model_path}")
     except Exception as e:
         print(f"Error downloading model: {e}")
         print("Please download the model manually from:")
@@ -6,19 +6,45 @@ Run this script to create the database tables.
 
 from database.db import engine
 from database.models import Base
-from sqlalchemy import inspect
-import sqlite3
+from sqlalchemy import inspect, text
 
 def add_column_if_not_exists(conn, table_name, column_name, column_type):
     """Add a column to a table if it doesn't exist"""
-    cursor = conn.cursor()
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [info[1] for info in cursor.fetchall()]
+    columns = {column["name"] for column in inspect(conn).get_columns(table_name)}
     
     if column_name not in columns:
-        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
         print(f"Added column {column_name} to table {table_name}")
 
+def create_index_if_not_exists(conn, index_name, table_name, column_name, unique=False):
+    """Create an index on a table column if it doesn't exist"""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(text(f"CREATE {kind} IF NOT EXISTS {index_name} ON {table_name} ({column_name})"))
+
+def backfill_problem_topics(conn):
+    """Populate problem_topics from the JSON topics column of existing problems"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "INSERT INTO problem_topics (problem_id, topic) "
+            "SELECT id, json_array_elements_text(topics) FROM problems "
+            "WHERE topics IS NOT NULL ON CONFLICT DO NOTHING"
+        ))
+    else:
+        conn.execute(text(
+            "INSERT OR IGNORE INTO problem_topics (problem_id, topic) "
+            "SELECT problems.id, json_each.value FROM problems, json_each(problems.topics) "
+            "WHERE problems.topics IS NOT NULL"
+        ))
+
+def backfill_test_case_ordinals(conn):
+    """Number test cases added before the ordinal column in id order, matching their original insertion order"""
+    conn.execute(text(
+        "UPDATE test_cases SET ordinal = ("
+        "SELECT COUNT(*) FROM test_cases AS earlier "
+        "WHERE earlier.problem_id = test_cases.problem_id AND earlier.id < test_cases.id"
+        ") WHERE ordinal IS NULL"
+    ))
+
 def main():
     # Create tables
     inspector = inspect(engine)
@@ -29,11 +55,19 @@ def main():
     else:
         print("Database tables already exist, checking for migrations...")
         
-        # Add any missing columns (for migrations)
-        conn = sqlite3.connect('coding_platform.db')
-        add_column_if_not_exists(conn, 'problems', 'starter_code', 'TEXT')
-        conn.commit()
-        conn.close()
+        # Create any tables added since the database was first initialized
+        Base.metadata.create_all(bind=engine)
+        
+        # Add any missing columns (for migrations) in one transaction on the pooled engine
+        with engine.begin() as conn:
+            add_column_if_not_exists(conn, 'problems', 'starter_code', 'TEXT')
+            add_column_if_not_exists(conn, 'problems', 'serialized', 'TEXT')
+            create_index_if_not_exists(conn, 'ix_problems_diff_id', 'problems', 'difficulty, id')
+            create_index_if_not_exists(conn, 'ix_test_cases_problem_id', 'test_cases', 'problem_id')
+            add_column_if_not_exists(conn, 'test_cases', 'ordinal', 'INTEGER')
+            backfill_test_case_ordinals(conn)
+            create_index_if_not_exists(conn, 'uq_test_cases_problem_ordinal', 'test_cases', 'problem_id, ordinal', unique=True)
+            backfill_problem_topics(conn)
         
         print("Database migration completed!")
 
@@ -1,54 +1,198 @@
-from fastapi import FastAPI, HTTPException, Body, Depends
+from fastapi import FastAPI, HTTPException, Body, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any, Union
-import uuid
+import asyncio
+import atexit
+import contextlib
+import functools
+import hashlib
+import logging
+import logging.handlers
+import os
+import queue
+import signal
 import time
+import httpx
 import psutil
-import json
-import random
+import orjson
+import subprocess
+import tempfile
+import threading
+from cachetools import TTLCache
+import llama_cpp
 from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
 from sqlalchemy.orm import Session
 
+# Log through a queue drained by a background thread, so request threads never block on console I/O
+LOG_QUEUE = queue.SimpleQueue()
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter("%(levelname)s:     %(message)s"))
+log_listener = logging.handlers.QueueListener(LOG_QUEUE, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# This module's logger and the parser's share the queue and level
+for logger_name in (__name__, "parsing"):
+    configured_logger = logging.getLogger(logger_name)
+    configured_logger.addHandler(logging.handlers.QueueHandler(LOG_QUEUE))
+    configured_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    configured_logger.propagate = False
+logger = logging.getLogger(__name__)
+
 # Import database modules
-from database.db import get_db, engine
+from database.db import SessionLocal, get_db, engine
 from database.models import Base
 from database.operations import (
     create_problem, 
     get_problem, 
-    get_all_problems, 
-    get_problems_by_topic, 
-    get_problems_by_difficulty,
+    get_problem_json,
+    get_problems_json,
     update_problem,
     delete_problem
 )
+from parsing import parse_llama_problem_response
 
 # Initialize the database
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
-# Configure CORS
+# Configure CORS for the known frontend origins; explicit lists skip the wildcard
+# handling, and max_age lets browsers reuse a preflight for a day
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:3001").split(",")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
+# Optional OpenAI-compatible completion server (e.g. `vllm serve` with continuous batching);
+# when set, generations go there and the in-process model is not loaded
+LLM_SERVER_URL = os.getenv("LLM_SERVER_URL")
+LLM_SERVER_MODEL = os.getenv("LLM_SERVER_MODEL", "meta-llama/Llama-2-7b-chat-hf")
+llm_client = httpx.AsyncClient(base_url=LLM_SERVER_URL, timeout=httpx.Timeout(300, connect=5)) if LLM_SERVER_URL else None
+
+# Optional quantized KV cache, e.g. LLAMA_KV_CACHE_TYPE=q8_0, halving the cache bytes each decode
+# step reads; llama.cpp only quantizes the V cache with flash attention enabled
+LLAMA_KV_CACHE_TYPE = os.getenv("LLAMA_KV_CACHE_TYPE")
+kv_cache_options = {}
+if LLAMA_KV_CACHE_TYPE:
+    kv_cache_type = getattr(llama_cpp, f"GGML_TYPE_{LLAMA_KV_CACHE_TYPE.upper()}")
+    kv_cache_options = {"type_k": kv_cache_type, "type_v": kv_cache_type, "flash_attn": True}
+
+# Optional speculative decoding with prompt lookup: draft tokens are copied from n-grams
+# already in the context, which the fixed output format repeats heavily. The number of
+# tokens drafted per step; llama-cpp-python suggests ~10 on GPU and ~2 on CPU.
+LLAMA_DRAFT_TOKENS = int(os.getenv("LLAMA_DRAFT_TOKENS", "0"))
+draft_options = {"draft_model": LlamaPromptLookupDecoding(num_pred_tokens=LLAMA_DRAFT_TOKENS)} if LLAMA_DRAFT_TOKENS else {}
+
+# Threads llama.cpp decodes with. Decoding is memory-bound, so half the CPUs (llama-cpp-python's
+# own default) decode about as fast as all of them and leave the rest to the sandbox
+CPU_COUNT = os.cpu_count() or 1
+LLAMA_THREADS = int(os.getenv("LLAMA_THREADS", str(max(1, CPU_COUNT // 2))))
+
 # Initialize Llama model
-try:
-    print("Loading Llama model...")
-    model = Llama(
-        model_path="models/llama-2-7b-chat.gguf",
-        n_ctx=2048,
-        n_threads=4
-    )
-    print("Llama model loaded successfully!")
-except Exception as e:
-    print(f"Error loading Llama model: {e}")
-    model = None
+model = None
+if LLM_SERVER_URL:
+    logger.info("Using completion server at %s", LLM_SERVER_URL)
+else:
+    try:
+        logger.info("Loading Llama model...")
+        model = Llama(
+            model_path="models/llama-2-7b-chat.gguf",
+            n_ctx=2048,
+            n_threads=LLAMA_THREADS,
+            # Layers to offload when llama-cpp-python is built with GPU support (-1 offloads all)
+            n_gpu_layers=int(os.getenv("LLAMA_GPU_LAYERS", "0")),
+            # The weights are memory-mapped by default (use_mmap); LLAMA_MLOCK=1 also locks them
+            # in RAM so they can't be paged out (needs a high enough RLIMIT_MEMLOCK)
+            use_mlock=os.getenv("LLAMA_MLOCK", "0") == "1",
+            **kv_cache_options,
+            **draft_options
+        )
+        logger.info("Llama model loaded successfully!")
+    except Exception as e:
+        logger.error("Error loading Llama model: %s", e)
+
+# llama.cpp contexts are not thread-safe, so only one completion runs at a time;
+# beyond MAX_WAITING_COMPLETIONS queued requests we answer 503 instead of piling up
+MAX_WAITING_COMPLETIONS = int(os.getenv("MAX_WAITING_COMPLETIONS", "8"))
+model_lock = asyncio.Lock()
+completion_slots = asyncio.Semaphore(MAX_WAITING_COMPLETIONS + 1)
+
+async def iterate_in_thread(make_iterator, *args, **kwargs):
+    """Yield the items of a blocking iterator as a worker thread produces them"""
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    cancelled = threading.Event()
+    finished = object()
+    
+    def produce():
+        try:
+            # Close the iterator here, so a generator's cleanup runs in this thread as soon as it stops
+            with contextlib.closing(make_iterator(*args, **kwargs)) as iterator:
+                for item in iterator:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(items.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(items.put_nowait, finished)
+    
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    try:
+        while True:
+            item = await items.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # If the consumer went away, stop the iterator before returning
+        cancelled.set()
+        await producer
+
+def server_request(prompt: str, kwargs: dict):
+    """Build a /v1/completions request body from llama.cpp-style sampling parameters"""
+    params = {("repetition_penalty" if key == "repeat_penalty" else key): value for key, value in kwargs.items()}
+    return {"model": LLM_SERVER_MODEL, "prompt": prompt, **params}
+
+async def server_stream(prompt: str, **kwargs):
+    """Yield completion text from the completion server's server-sent events; it batches concurrent requests"""
+    body = {**server_request(prompt, kwargs), "stream": True}
+    async with llm_client.stream("POST", "/v1/completions", json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            yield orjson.loads(data)["choices"][0]["text"]
+
+async def llm_stream(prompt: Union[str, List[int]], **kwargs):
+    """Yield completion text as llama.cpp produces it from a worker thread, holding the model for the whole stream"""
+    if LLM_SERVER_URL:
+        async for text in server_stream(prompt, **kwargs):
+            yield text
+        return
+    
+    if completion_slots.locked():
+        raise HTTPException(status_code=503, detail="Llama model is busy. Please try again shortly.")
+    async with completion_slots:
+        async with model_lock:
+            # Close the stream before releasing the model, so decoding has stopped when the next request starts
+            async with contextlib.aclosing(iterate_in_thread(model.create_completion, prompt, stream=True, **kwargs)) as chunks:
+                async for chunk in chunks:
+                    yield chunk["choices"][0]["text"]
 
 class CodeSubmission(BaseModel):
     code: str
@@ -86,50 +230,51 @@ class EvaluationResult(BaseModel):
 @app.get("/api/problems/{problem_id}")
 async def get_problem_by_id(problem_id: str, db: Session = Depends(get_db)):
     """Get a specific problem by ID"""
-    problem = get_problem(db, problem_id)
+    problem = get_problem_json(db, problem_id)
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
-    return problem.to_dict()
+    return Response(content=problem, media_type="application/json")
 
 @app.get("/api/problems")
 async def list_problems(
-    skip: int = 0, 
+    after_id: Optional[str] = None, 
     limit: int = 100, 
     topic: Optional[str] = None, 
     difficulty: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all problems with optional filtering"""
-    if topic:
-        problems = get_problems_by_topic(db, topic, skip, limit)
-    elif difficulty:
-        problems = get_problems_by_difficulty(db, difficulty, skip, limit)
-    else:
-        problems = get_all_problems(db, skip, limit)
-    
-    return [problem.to_dict() for problem in problems]
+    """Get all problems with optional filtering; pass the last id of a page as after_id for the next"""
+    problems = get_problems_json(db, after_id, limit, topic=topic, difficulty=difficulty)
+    return Response(content=problems, media_type="application/json")
 
-@app.post("/api/problems/generate")
-async def generate_problem(
-    topic: str = "arrays",
-    difficulty: str = "medium",
-    db: Session = Depends(get_db)
-):
-    """Generate a new coding problem using Llama"""
-    # Check if model is available
-    if model is None:
-        raise HTTPException(status_code=500, detail="Llama model not available. Please make sure the model file exists.")
-    
-    print(f"Generating problem with topic: {topic}, difficulty: {difficulty}")
-    
-    # Create a prompt for Llama to generate a problem in LeetCode format
-    prompt = f"""<s>[INST] You are a coding interview question generator.
-I want you to generate a unique coding question about {topic} with {difficulty} difficulty.
+# Problems generated per (topic, difficulty), so requests that opt in with cache=1 skip the LLM entirely
+generated_problem_cache = TTLCache(maxsize=256, ttl=3600)
+
+# Sampling settings for problem generation. A complete problem runs well under max_tokens, so the
+# cap only bounds a runaway completion; the stop strings end one that starts a new chat turn
+GENERATION_PARAMS = {
+    "max_tokens": 1200,
+    "stop": ["[INST]", "</s>"],
+    "temperature": 0.8,
+    "top_p": 0.95,
+    "top_k": 40,
+    "repeat_penalty": 1.1
+}
+
+def generation_cache_key(topic: str, difficulty: str):
+    """Normalize generation parameters so e.g. "Arrays"/"array" share an entry"""
+    return (topic.strip().lower().removesuffix("s"), difficulty.strip().lower())
+
+# Everything that doesn't depend on the request comes first: llama-cpp-python only re-evaluates
+# the tokens after the prefix shared with what is already in the context, so this part is
+# prefilled once at startup and reused by every generation
+PROBLEM_PROMPT_PREFIX = """<s>[INST] You are a coding interview question generator.
+I want you to generate a unique coding question.
 
 The question should be in this exact format:
 1. [Title of the Problem]
-{difficulty}
-Topics: {topic}
+[Difficulty]
+Topics: [Topic]
 
 Hint:
 A concise hint to guide solving strategy
@@ -166,50 +311,236 @@ def solution(input_params):
     pass
 ```
 
+"""
+
+PROBLEM_PROMPT_SUFFIX = """The question must be about {topic} with {difficulty} difficulty: write "{difficulty}" as the difficulty line and "Topics: {topic}" as the topics line.
 Please create a completely original coding question that is directly related to {topic} and appropriate for {difficulty} difficulty level. Make sure all examples are consistent with your description, and that the description is comprehensive and clear. [/INST]</s>
 """
+
+if model is not None:
+    PROBLEM_PROMPT_PREFIX_TOKENS = model.tokenize(PROBLEM_PROMPT_PREFIX.encode("utf-8"), special=True)
+    model.eval(PROBLEM_PROMPT_PREFIX_TOKENS)
+
+@functools.lru_cache(maxsize=256)
+def problem_prompt_suffix_tokens(topic: str, difficulty: str):
+    """Tokenize the topic/difficulty part of the prompt once per pair"""
+    suffix = PROBLEM_PROMPT_SUFFIX.format(topic=topic, difficulty=difficulty)
+    return tuple(model.tokenize(suffix.encode("utf-8"), add_bos=False, special=True))
+
+def build_problem_prompt(topic: str, difficulty: str):
+    """Create the prompt tokens for Llama to generate a problem in LeetCode format"""
+    if model is None:
+        # The completion server tokenizes (and prefix-caches) the text itself
+        return PROBLEM_PROMPT_PREFIX + PROBLEM_PROMPT_SUFFIX.format(topic=topic, difficulty=difficulty)
+    return PROBLEM_PROMPT_PREFIX_TOKENS + list(problem_prompt_suffix_tokens(topic, difficulty))
+
+async def generate_problem_text(topic: str, difficulty: str):
+    """
+    Yield the generated problem text as it is produced.
+    Starter code is the last section of the format, so decoding stops once its code block closes
+    rather than running on to max_tokens.
+    """
+    stream = llm_stream(build_problem_prompt(topic, difficulty), **GENERATION_PARAMS)
+    text = ""
+    code_start = -1
+    try:
+        async for chunk in stream:
+            yield chunk
+            # Only rescan the new chunk plus enough overlap to catch a fence split across chunks
+            scan_from = max(len(text) - len("```python"), 0)
+            text += chunk.lower()
+            if code_start < 0:
+                opening = text.find("```python", scan_from)
+                if opening < 0:
+                    continue
+                code_start = opening + len("```python")
+                scan_from = code_start
+            if text.find("```", max(scan_from, code_start)) >= 0:
+                logger.info("Starter code block closed, stopping generation")
+                break
+    finally:
+        await stream.aclose()
+
+def get_cached_generated_problem(db: Session, topic: str, difficulty: str):
+    """Return the JSON of a problem already generated for these parameters, if it still exists"""
+    cached_problem_id = generated_problem_cache.get(generation_cache_key(topic, difficulty))
+    if cached_problem_id:
+        return get_problem_json(db, cached_problem_id)
+    return None
+
+def create_generated_problem(db: Session, problem_text: str, topic: str):
+    """Parse generated text and store the problem, returning its ID and JSON (None if parsing failed)"""
+    parsed_problem = parse_llama_problem_response(problem_text, topic)
+    if not parsed_problem:
+        logger.warning("Failed to parse problem")
+        return None
     
+    logger.info("Successfully parsed problem")
+    db_problem = create_problem(db, parsed_problem)
+    return db_problem.id, db_problem.serialize()
+
+async def store_generated_problem(db: Session, problem_text: str, topic: str, difficulty: str):
+    """Parse and store generated text off the event loop, returning the problem's JSON (None if parsing failed)"""
+    created = await asyncio.to_thread(create_generated_problem, db, problem_text, topic)
+    if not created:
+        return None
+    
+    problem_id, problem = created
+    generated_problem_cache[generation_cache_key(topic, difficulty)] = problem_id
+    return problem
+
+def ensure_model_available():
+    """Fail fast, before any response is started, if the model can't take a request"""
+    if LLM_SERVER_URL:
+        return
+    if model is None:
+        raise HTTPException(status_code=500, detail="Llama model not available. Please make sure the model file exists.")
+    if completion_slots.locked():
+        raise HTTPException(status_code=503, detail="Llama model is busy. Please try again shortly.")
+
+# Generations in flight, keyed like generated_problem_cache, so concurrent identical
+# requests share one completion instead of each queueing for the model
+generations_in_flight: Dict[tuple, asyncio.Future] = {}
+
+async def coalesced_generation(db: Session, topic: str, difficulty: str):
+    """Generate and store a problem, joining an identical generation that is already running"""
+    key = generation_cache_key(topic, difficulty)
+    if key in generations_in_flight:
+        logger.info("Joining in-flight generation for topic: %s, difficulty: %s", topic, difficulty)
+        return await asyncio.shield(generations_in_flight[key])
+    
+    ensure_model_available()
+    future = asyncio.get_running_loop().create_future()
+    generations_in_flight[key] = future
     try:
-        print("Sending prompt to Llama model...")
-        # Generate response using Llama
-        response = model.create_completion(
-            prompt,
-            max_tokens=2048,
-            temperature=0.8,
-            top_p=0.95,
-            top_k=40,
-            repeat_penalty=1.1
-        )
-        
-        print("Received response from Llama")
-        problem_text = response["choices"][0]["text"]
-        print(f"Generated problem text: {problem_text[:100]}...")
+        problem = await run_generation(db, topic, difficulty)
+        future.set_result(problem)
+        return problem
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception retrieved so an unjoined failure isn't logged twice
+        future.exception()
+        raise
+    finally:
+        del generations_in_flight[key]
+
+async def run_generation(db: Session, topic: str, difficulty: str):
+    """Run one Llama completion for a problem and store it, returning its JSON"""
+    logger.info("Generating problem with topic: %s, difficulty: %s", topic, difficulty)
+    
+    try:
+        logger.info("Sending prompt to Llama model...")
+        # Generate response using Llama, off the event loop so other requests keep being served
+        problem_text = "".join([text async for text in generate_problem_text(topic, difficulty)])
         
-        # Parse the generated problem
-        parsed_problem = parse_llama_problem_response(problem_text, topic)
+        logger.info("Received response from Llama")
+        logger.debug("Generated problem text: %s...", problem_text[:100])
         
-        if parsed_problem:
-            print("Successfully parsed problem")
-            # Store the problem in the database
-            db_problem = create_problem(db, parsed_problem)
-            return db_problem.to_dict()
-        else:
-            print("Failed to parse problem")
+        # Parse the generated problem and store it in the database
+        problem = await store_generated_problem(db, problem_text, topic, difficulty)
+        if not problem:
             raise HTTPException(status_code=500, detail="Failed to parse generated problem")
+        return problem
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error generating problem with Llama: {e}")
+        logger.exception("Error generating problem with Llama")
         raise HTTPException(status_code=500, detail=f"Error generating problem: {str(e)}")
 
-def execute_code_sandbox(code: str, language: str, test_input: str):
+@app.post("/api/problems/generate")
+async def generate_problem(
+    topic: str = "arrays",
+    difficulty: str = "medium",
+    cache: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Generate a new coding problem using Llama"""
+    if not cache:
+        ensure_model_available()
+        problem = await run_generation(db, topic, difficulty)
+        return Response(content=problem, media_type="application/json")
+    
+    # With cache=1, serve a problem already generated for these parameters if it still exists,
+    # or share an identical generation that is already running
+    cached_problem = get_cached_generated_problem(db, topic, difficulty)
+    if cached_problem:
+        return Response(content=cached_problem, media_type="application/json")
+    
+    problem = await coalesced_generation(db, topic, difficulty)
+    return Response(content=problem, media_type="application/json")
+
+def sse_event(payload: str):
+    """Format a JSON payload as a server-sent event"""
+    return f"data: {payload}\n\n"
+
+@app.post("/api/problems/generate/stream")
+async def generate_problem_stream(topic: str = "arrays", difficulty: str = "medium", cache: bool = False):
+    """
+    Generate a new coding problem using Llama, streaming tokens as server-sent events.
+    Emits {"type": "token"} events while generating, then one {"type": "problem"} event
+    with the stored problem (or {"type": "error"}).
+    """
+    db = SessionLocal()
+    # With cache=1, a problem already generated for these parameters is sent as the only event
+    cached_problem = cache and get_cached_generated_problem(db, topic, difficulty)
+    if not cached_problem:
+        try:
+            ensure_model_available()
+        except HTTPException:
+            db.close()
+            raise
+    
+    async def events():
+        try:
+            if cached_problem:
+                yield sse_event(f'{{"type": "problem", "problem": {cached_problem}}}')
+                return
+            
+            text_parts = []
+            async for text in generate_problem_text(topic, difficulty):
+                text_parts.append(text)
+                yield sse_event(orjson.dumps({"type": "token", "text": text}).decode())
+            
+            problem = await store_generated_problem(db, "".join(text_parts), topic, difficulty)
+            if problem:
+                yield sse_event(f'{{"type": "problem", "problem": {problem}}}')
+            else:
+                yield sse_event(orjson.dumps({"type": "error", "detail": "Failed to parse generated problem"}).decode())
+        except Exception as e:
+            logger.exception("Error generating problem with Llama")
+            yield sse_event(orjson.dumps({"type": "error", "detail": f"Error generating problem: {str(e)}"}).decode())
+        finally:
+            db.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+# Interpreter that runs submissions, e.g. a PGO/LTO build of CPython
+SANDBOX_PYTHON = os.getenv("SANDBOX_PYTHON", "python3")
+
+# Opened once rather than re-reading /proc/<pid> for every test case
+SERVER_PROCESS = psutil.Process()
+
+@contextlib.contextmanager
+def code_file(code: str):
+    """Write submitted code to one temporary file that every test case of a run executes"""
+    # Create a temporary file to store the code
+    with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as temp_file:
+        temp_file.write(code.encode('utf-8'))
+    try:
+        yield temp_file.name
+    finally:
+        # Clean up the temporary file
+        os.remove(temp_file.name)
+
+def execute_code_sandbox(code_path: str, language: str, test_input: str):
     """
-    Execute code with the given input in a sandboxed environment.
+    Execute the code file with the given input in a sandboxed environment.
     This is a simplified implementation for Python code only.
     In a production environment, use Docker or similar for better isolation.
     """
-    import subprocess
-    import tempfile
-    import os
-    
     if language.lower() != "python":
         return {
             "output": f"Language {language} is not supported. Only Python is supported at this time.",
@@ -218,19 +549,12 @@ def execute_code_sandbox(code: str, language: str, test_input: str):
         }
     
     try:
-        # Create a temporary file to store the code
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as temp_file:
-            # Write the code to the file
-            temp_file.write(code.encode('utf-8'))
-            temp_file_path = temp_file.name
-        
         # Set up command to run with input piped in
-        cmd = ['python3', temp_file_path]
+        cmd = [SANDBOX_PYTHON, code_path]
         
         # Start measuring time and memory
-        start_time = time.time()
-        current_process = psutil.Process()
-        start_memory = current_process.memory_info().rss
+        start_time = time.perf_counter()
+        start_memory = SERVER_PROCESS.memory_info().rss
         
         # Run the process with a timeout to prevent infinite loops
         try:
@@ -242,8 +566,8 @@ def execute_code_sandbox(code: str, language: str, test_input: str):
             )
             
             # Measure time and memory after execution
-            end_time = time.time()
-            end_memory = current_process.memory_info().rss
+            end_time = time.perf_counter()
+            end_memory = SERVER_PROCESS.memory_info().rss
             
             output = completed_process.stdout.decode('utf-8')
             error = completed_process.stderr.decode('utf-8')
@@ -251,7 +575,7 @@ def execute_code_sandbox(code: str, language: str, test_input: str):
             # If there was an error, return it
             if error:
                 return {
-                    "output": f"Error: {error}",
+                    "output": f"Error: {error.rstrip()}",
                     "execution_time": 0,
                     "memory_usage": 0
                 }
@@ -277,83 +601,255 @@ def execute_code_sandbox(code: str, language: str, test_input: str):
             "execution_time": 0,
             "memory_usage": 0
         }
+
+# Warm harness interpreters that fork a child per test input; at most one per sandbox slot
+SANDBOX_HARNESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_harness.py")
+SANDBOX_TIMEOUT = 5
+idle_sandbox_workers = queue.SimpleQueue()
+
+def kill_sandbox_worker(worker: subprocess.Popen):
+    """Kill a sandbox worker together with any test child it has forked"""
+    try:
+        os.killpg(worker.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    worker.wait()
+
+def sandbox_cases(code_path: str, test_inputs: list):
+    """Yield each test input's result as a sandbox worker finishes it, starting a worker if none is idle"""
+    # Take without blocking: another batch may empty the queue between a check and a get
+    worker = None
+    while worker is None:
+        try:
+            worker = idle_sandbox_workers.get_nowait()
+        except queue.Empty:
+            break
+        if worker.poll() is not None:
+            worker = None
+    if worker is None:
+        # In a session of its own, so its process group holds exactly the worker and its test children
+        worker = subprocess.Popen(
+            [SANDBOX_PYTHON, SANDBOX_HARNESS],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=True
+        )
+    
+    # Each case enforces its own limit; this only bounds a stuck worker
+    watchdog = threading.Timer(SANDBOX_TIMEOUT * (len(test_inputs) + 1), kill_sandbox_worker, [worker])
+    watchdog.start()
+    remaining = len(test_inputs)
+    try:
+        try:
+            worker.stdin.write(orjson.dumps({"code_path": code_path, "inputs": test_inputs, "timeout": SANDBOX_TIMEOUT}) + b"\n")
+            worker.stdin.flush()
+            while remaining:
+                response = worker.stdout.readline()
+                if not response:
+                    break
+                remaining -= 1
+                yield orjson.loads(response)
+        except OSError:
+            pass
+        if remaining:
+            raise RuntimeError("Sandbox worker exited unexpectedly")
     finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        watchdog.cancel()
+        # A worker left mid-request (it died, or the caller stopped reading) can't be reused
+        if remaining:
+            kill_sandbox_worker(worker)
+        else:
+            idle_sandbox_workers.put(worker)
+
+def execute_code_batch(code_path: str, test_inputs: list):
+    """
+    Execute the code file against every test input on a warm sandbox worker, yielding results in input order.
+    Only the interpreter startup is shared; each input still runs in a fresh process.
+    """
+    finished = 0
+    try:
+        for case in sandbox_cases(code_path, test_inputs):
+            finished += 1
+            if case["timed_out"]:
+                yield {
+                    "output": f"Execution timed out (limit: {SANDBOX_TIMEOUT} seconds)",
+                    "execution_time": SANDBOX_TIMEOUT * 1000,
+                    "memory_usage": 0
+                }
+            elif case["stderr"]:
+                # If there was an error, return it
+                yield {
+                    "output": f"Error: {case['stderr'].rstrip()}",
+                    "execution_time": 0,
+                    "memory_usage": 0
+                }
+            else:
+                yield {
+                    "output": case["stdout"].strip(),
+                    "execution_time": case["time"],
+                    "memory_usage": case["memory"]
+                }
+    except Exception as e:
+        for _ in test_inputs[finished:]:
+            yield {
+                "output": f"Error executing code: {str(e)}",
+                "execution_time": 0,
+                "memory_usage": 0
+            }
+
+# Sandbox results of recent runs, keyed on (code digest, language, test input)
+sandbox_result_cache = TTLCache(maxsize=1024, ttl=600)
+
+# Sandboxed programs running at once across all requests, so bursts of test cases
+# neither oversubscribe the CPUs nor fill the default thread pool the model also uses.
+# With a local model they get the CPUs its decode threads leave free.
+SANDBOX_SLOTS = int(os.getenv("SANDBOX_SLOTS", str(CPU_COUNT if model is None else max(1, CPU_COUNT - LLAMA_THREADS))))
+sandbox_slots = asyncio.Semaphore(SANDBOX_SLOTS)
+
+async def run_in_sandbox(code_path: str, language: str, test_input: str):
+    """Execute one test case in a worker thread once a sandbox slot is free"""
+    async with sandbox_slots:
+        return await asyncio.to_thread(execute_code_sandbox, code_path, language, test_input)
+
+def sandbox_cache_key(code: str, language: str, test_input: str):
+    """Build the exact-match sandbox cache key for a run"""
+    return (hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest(), language.lower(), test_input)
+
+async def pending_results(code_path: str, language: str, pending: list):
+    """Yield (key, result) for each uncached run as it finishes"""
+    if language.lower() == "python" and hasattr(os, "fork"):
+        # Split the inputs across up to one warm harness per sandbox slot, so they run in parallel
+        finished = asyncio.Queue()
+        
+        async def run_batch(keys):
+            try:
+                async with sandbox_slots:
+                    # Stop the batch before releasing the slot, even when the caller stops reading early
+                    async with contextlib.aclosing(iterate_in_thread(execute_code_batch, code_path, [key[2] for key in keys])) as results:
+                        keys = iter(keys)
+                        async for result in results:
+                            finished.put_nowait((next(keys), result))
+            except Exception as e:
+                finished.put_nowait(e)
+        
+        workers = min(len(pending), SANDBOX_SLOTS)
+        batches = [asyncio.ensure_future(run_batch(pending[start::workers])) for start in range(workers)]
+        try:
+            for _ in pending:
+                item = await finished.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for batch in batches:
+                batch.cancel()
+            await asyncio.gather(*batches, return_exceptions=True)
+        return
+    
+    async def run_one(key):
+        return key, await run_in_sandbox(code_path, language, key[2])
+    
+    runs = [asyncio.ensure_future(run_one(key)) for key in pending]
+    try:
+        for run in asyncio.as_completed(runs):
+            yield await run
+    finally:
+        for run in runs:
+            run.cancel()
+
+async def test_case_results(code: str, language: str, test_cases: list):
+    """Yield (index, result) for each test case as its run finishes, reusing cached results of identical runs"""
+    positions = {}
+    for index, test_case in enumerate(test_cases):
+        positions.setdefault(sandbox_cache_key(code, language, test_case.input_data), []).append(index)
+    
+    pending = []
+    for key, indices in positions.items():
+        result = sandbox_result_cache.get(key)
+        if result is None:
+            pending.append(key)
+            continue
+        for index in indices:
+            yield index, result
+    if not pending:
+        return
+    
+    # Each distinct uncached input runs once, against a single copy of the code
+    with code_file(code) as code_path:
+        async with contextlib.aclosing(pending_results(code_path, language, pending)) as results:
+            async for key, result in results:
+                # Timeouts and sandbox failures may be transient, so only cache completed runs
+                if not result["output"].startswith(("Execution timed out", "Error executing code")):
+                    sandbox_result_cache[key] = result
+                for index in positions[key]:
+                    yield index, result
+
+async def run_test_cases(code: str, language: str, test_cases: list):
+    """Execute code against every test case concurrently, returning the results in test case order"""
+    results = [None] * len(test_cases)
+    async for index, result in test_case_results(code, language, test_cases):
+        results[index] = result
+    return results
+
+def test_case_report(test_case, result: dict):
+    """Compare one sandbox result with its test case's expected output"""
+    # Sandbox results are already stripped
+    actual_output = result["output"]
+    expected_output = test_case.output_data.strip()
+    return {
+        # Compare outputs (ignoring whitespace)
+        "passed": actual_output == expected_output,
+        "input": test_case.input_data,
+        "expected_output": expected_output,
+        "actual_output": actual_output,
+        "execution_time": result["execution_time"],
+        "memory_usage": result["memory_usage"],
+        "is_hidden": test_case.is_hidden
+    }
+
+def run_summary(test_results: list):
+    """Calculate the overall metrics of a run from its test results"""
+    total_tests = len(test_results)
+    passed_count = sum(1 for test_result in test_results if test_result["passed"])
+    total_time = sum(test_result["execution_time"] for test_result in test_results)
+    total_memory = sum(test_result["memory_usage"] for test_result in test_results)
+    return {
+        "overall_metrics": {
+            "total_tests": total_tests,
+            "passed_tests": passed_count,
+            "success_rate": passed_count / total_tests if total_tests > 0 else 0,
+            "average_time": total_time / total_tests if total_tests > 0 else 0,
+            "average_memory": total_memory / total_tests if total_tests > 0 else 0,
+            "status": "Accepted" if passed_count == total_tests else "Wrong Answer",
+        },
+        "output": test_results[0]["actual_output"] if test_results else ""
+    }
+
+def problem_test_cases(db: Session, problem_id: str):
+    """Load the test cases a submission runs against"""
+    # Get the problem from the database
+    problem = get_problem(db, problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    
+    # Get all test cases for testing
+    if not problem.examples:
+        raise HTTPException(status_code=400, detail="No test cases available")
+    return problem.examples
 
 @app.post("/api/code/run")
 async def run_code(submission: CodeSubmission, db: Session = Depends(get_db)):
     """Run the submitted code against test cases"""
     try:
-        # Get the problem from the database
-        problem = get_problem(db, submission.problem_id)
-        if not problem:
-            raise HTTPException(status_code=404, detail="Problem not found")
-        
-        # Get all test cases for testing
-        if not problem.examples:
-            raise HTTPException(status_code=400, detail="No test cases available")
+        # Execute code in sandbox for all test cases
+        test_cases = problem_test_cases(db, submission.problem_id)
+        results = await run_test_cases(submission.code, submission.language, test_cases)
+        test_results = [test_case_report(test_case, result) for test_case, result in zip(test_cases, results)]
         
-        # Prepare results for all test cases
-        test_results = []
-        total_time = 0
-        total_memory = 0
-        passed_count = 0
-        
-        # Process all test cases
-        for test_case in problem.examples:
-            # Execute code in sandbox
-            result = execute_code_sandbox(
-                submission.code, 
-                submission.language, 
-                test_case.input_data
-            )
-            
-            # Get actual output
-            actual_output = result["output"].strip()
-            expected_output = test_case.output_data.strip()
-            
-            # Compare outputs (ignoring whitespace)
-            passed = actual_output == expected_output
-            if passed:
-                passed_count += 1
-            
-            execution_time = result["execution_time"]
-            memory_used = result["memory_usage"]
-            
-            total_time += execution_time
-            total_memory += memory_used
-            
-            # Add result to list
-            test_results.append({
-                "passed": passed,
-                "input": test_case.input_data,
-                "expected_output": expected_output,
-                "actual_output": actual_output,
-                "execution_time": execution_time,
-                "memory_usage": memory_used,
-                "is_hidden": test_case.is_hidden
-            })
-        
-        # Calculate overall metrics
-        total_tests = len(test_results)
-        
-        return {
-            "test_results": test_results,
-            "overall_metrics": {
-                "total_tests": total_tests,
-                "passed_tests": passed_count,
-                "success_rate": passed_count / total_tests if total_tests > 0 else 0,
-                "average_time": total_time / total_tests if total_tests > 0 else 0,
-                "average_memory": total_memory / total_tests if total_tests > 0 else 0,
-                "status": "Accepted" if passed_count == total_tests else "Wrong Answer",
-            },
-            "output": test_results[0]["actual_output"] if test_results else ""
-        }
+        # Return the response directly so orjson serializes it without FastAPI's jsonable_encoder pass
+        return ORJSONResponse({"test_results": test_results, **run_summary(test_results)})
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error running code")
         return {
             "test_results": [],
             "overall_metrics": {
@@ -367,190 +863,37 @@ async def run_code(submission: CodeSubmission, db: Session = Depends(get_db)):
             "output": f"Error: {str(e)}"
         }
 
-def parse_llama_problem_response(text, topic="arrays"):
-    """Parse the Llama generated response into a structured problem"""
-    try:
-        print(f"Parsing response text length: {len(text)}")
-        print(f"First 300 chars: {text[:300]}")
-        lines = text.split('\n')
-        problem = {}
-        
-        # Initialize with default values
-        problem["id"] = str(uuid.uuid4())
-        problem["title"] = "Untitled Problem"
-        problem["difficulty"] = "medium"
-        problem["description"] = "No description provided."
-        problem["examples"] = []
-        problem["constraints"] = ["No constraints provided"]
-        problem["topics"] = [topic.capitalize()]
-        problem["hint"] = ""
-        problem["starterCode"] = ""
-        
-        current_section = None
-        current_example = {}
-        starter_code_lines = []
-        collect_starter_code = False
-        description_text = []
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            print(f"Processing line {i}: {line[:50]}...")
-                
-            # Parse title and difficulty
-            if ". " in line and not current_section:
-                parts = line.split(". ", 1)
-                if len(parts) == 2:
-                    problem["title"] = parts[1]
-                    print(f"Found title: {problem['title']}")
-                    continue
-            
-            # Also handle format "1. Title"
-            if line.startswith("1. ") and not current_section:
-                problem["title"] = line.replace("1. ", "").strip()
-                print(f"Found title: {problem['title']}")
-                continue
-            
-            # Parse difficulty
-            if line.lower() in ["easy", "medium", "hard"]:
-                problem["difficulty"] = line.lower()
-                print(f"Found difficulty: {problem['difficulty']}")
-                continue
-                
-            # Parse topics
-            if line.startswith("Topics:") or line.startswith("Topic:"):
-                topics = line.replace("Topics:", "").replace("Topic:", "").strip()
-                problem["topics"] = [t.strip() for t in topics.split(",")]
-                print(f"Found topics: {problem['topics']}")
-                continue
-                
-            # Parse hint
-            if line.startswith("Hint:"):
-                problem["hint"] = line.replace("Hint:", "").strip()
-                print(f"Found hint: {problem['hint']}")
-                continue
-                
-            # Parse description
-            if line == "Description:":
-                current_section = "description"
-                description_text = []
-                print("Found description section")
-                continue
-                
-            # Parse examples
-            if line.startswith("Example"):
-                if current_section == "description":
-                    problem["description"] = "\n".join(description_text).strip()
-                    print(f"Set description with {len(description_text)} lines")
-                
-                if current_example and "input" in current_example and "output" in current_example:
-                    problem["examples"].append(current_example)
-                    print(f"Added example: {current_example}")
-                current_example = {}
-                current_section = "example"
-                print("Found example section")
-                continue
-                
-            # Parse constraints
-            if line == "Constraints:":
-                if current_section == "description":
-                    problem["description"] = "\n".join(description_text).strip()
-                    print(f"Set description with {len(description_text)} lines")
-                
-                current_section = "constraints"
-                problem["constraints"] = []
-                print("Found constraints section")
-                continue
-                
-            # Look for Python Starter Code
-            if line == "Python Starter Code:" or line.startswith("```python"):
-                if current_section == "description":
-                    problem["description"] = "\n".join(description_text).strip()
-                    print(f"Set description with {len(description_text)} lines")
-                
-                current_section = "starter_code"
-                collect_starter_code = True
-                starter_code_lines = []
-                print("Found starter code section")
-                continue
-                
-            if line == "```" and collect_starter_code:
-                collect_starter_code = False
-                continue
-                
-            # Handle content based on current section
-            if current_section == "description":
-                description_text.append(line)
-            elif current_section == "example":
-                if line.startswith("Input:"):
-                    current_example["input"] = line.replace("Input:", "").strip()
-                elif line.startswith("Output:"):
-                    current_example["output"] = line.replace("Output:", "").strip()
-                elif line.startswith("Explanation:"):
-                    current_example["explanation"] = line.replace("Explanation:", "").strip()
-            elif current_section == "constraints":
-                if line.startswith("-") or line.startswith("*") or line.startswith("•"):
-                    problem["constraints"].append(line.lstrip("-*• ").strip())
-                else:
-                    problem["constraints"].append(line.strip())
-            elif current_section == "starter_code" and collect_starter_code:
-                if not line.startswith("```"):
-                    starter_code_lines.append(line)
-            # Also detect if any line is starter code (def or class)
-            elif line.startswith("def ") or line.startswith("class "):
-                if current_section != "starter_code":
-                    current_section = "starter_code"
-                    starter_code_lines = [line]
-                else:
-                    starter_code_lines.append(line)
-        
-        # Finalize description if we're still in that section
-        if current_section == "description":
-            problem["description"] = "\n".join(description_text).strip()
-            print(f"Set description with {len(description_text)} lines at the end")
-        
-        # Add the last example if exists
-        if current_example and "input" in current_example and "output" in current_example:
-            problem["examples"].append(current_example)
-            print(f"Added final example: {current_example}")
-            
-        # Ensure we have at least one example
-        if not problem["examples"]:
-            problem["examples"].append({
-                "input": "sample input",
-                "output": "sample output"
-            })
-            print("Added default example")
-            
-        # Set the starter code
-        if starter_code_lines:
-            problem["starterCode"] = "\n".join(starter_code_lines)
-            print(f"Set starter code with {len(starter_code_lines)} lines")
-        else:
-            # Create a generic starter code if none was generated
-            function_name = "solve_problem"
-            if problem["title"]:
-                function_name = problem["title"].lower().replace(" ", "_").replace("-", "_")
-                function_name = ''.join(c for c in function_name if c.isalnum() or c == '_')
-            
-            problem["starterCode"] = f"""def {function_name}(input_data):
-    # TODO: Implement your solution here
-    pass"""
-            print(f"Created default starter code with function name: {function_name}")
-        
-        print(f"Final parsed problem: {problem['title']}")
-        print(f"Description length: {len(problem['description'])}")
-        print(f"Description preview: {problem['description'][:100]}...")
-        return problem
-                
-    except Exception as e:
-        print(f"Error parsing problem: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+@app.post("/api/code/run/stream")
+async def run_code_stream(submission: CodeSubmission, db: Session = Depends(get_db)):
+    """
+    Run the submitted code against test cases, streaming newline-delimited JSON.
+    Emits one {"type": "result", "index": ...} line per test case as soon as it finishes,
+    in completion order, then one {"type": "summary"} line (or {"type": "error"}).
+    """
+    # Load the test cases before responding, so a missing problem is still a plain 404/400
+    test_cases = problem_test_cases(db, submission.problem_id)
+    
+    async def lines():
+        test_results = [None] * len(test_cases)
+        try:
+            async for index, result in test_case_results(submission.code, submission.language, test_cases):
+                test_results[index] = test_case_report(test_cases[index], result)
+                yield orjson.dumps({"type": "result", "index": index, **test_results[index]}) + b"\n"
+            yield orjson.dumps({"type": "summary", **run_summary(test_results)}) + b"\n"
+        except Exception as e:
+            logger.exception("Error running code")
+            yield orjson.dumps({"type": "error", "detail": f"Error: {str(e)}"}) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # libuv-based event loop and C HTTP parser; uvloop has no Windows build
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    ) 
\ No newline at end of file
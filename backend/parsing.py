@@ -0,0 +1,191 @@
+"""
+Parser for the problems the LLM generates.
+Kept free of the server's dependencies and fully annotated so mypyc can compile it:
+`mypyc parsing.py` builds an extension module that is imported in place of this file.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Difficulty lines and section headers of a generated problem; the matching group name identifies the line
+SECTION_HEADER_RE = re.compile(
+    r"(?P<difficulty>(?i:easy|medium|hard)$)"
+    r"|(?P<topics>Topics?:)"
+    r"|(?P<hint>Hint:)"
+    r"|(?P<description>Description:$)"
+    r"|(?P<example>Example)"
+    r"|(?P<constraints>Constraints:$)"
+    r"|(?P<starter_code>Python Starter Code:$|```python)"
+)
+EXAMPLE_FIELD_RE = re.compile(r"(Input|Output|Explanation):")
+
+# Fenced code blocks with a language tag, e.g. ```python ... ```
+CODE_BLOCK_RE = re.compile(r"```[ \t]*(cpp|c\+\+|java|python|c)[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+
+def extract_code_blocks(text: str) -> Dict[str, str]:
+    """Map each language to the first fenced code block written in it, in one pass over the text"""
+    blocks: Dict[str, str] = {}
+    for match in CODE_BLOCK_RE.finditer(text):
+        language = match.group(1).lower().replace("c++", "cpp")
+        blocks.setdefault(language, match.group(2).rstrip())
+    return blocks
+
+# Scalar fields of a parsed problem that the response did not provide
+PARSED_PROBLEM_DEFAULTS: Dict[str, str] = {
+    "title": "Untitled Problem",
+    "difficulty": "medium",
+    "description": "No description provided.",
+    "hint": "",
+    "starterCode": ""
+}
+
+def parse_llama_problem_response(text: str, topic: str = "arrays") -> Optional[Dict[str, Any]]:
+    """Parse the Llama generated response into a structured problem"""
+    try:
+        logger.debug("Parsing response text length: %d", len(text))
+        logger.debug("First 300 chars: %s", text[:300])
+        lines = text.split('\n')
+        
+        # Initialize with default values; the lists are fresh per problem so they can be mutated
+        problem: Dict[str, Any] = {
+            **PARSED_PROBLEM_DEFAULTS,
+            "examples": [],
+            "constraints": ["No constraints provided"],
+            "topics": [topic.capitalize()]
+        }
+        
+        current_section: Optional[str] = None
+        current_example: Dict[str, str] = {}
+        starter_code_lines: List[str] = []
+        collect_starter_code = False
+        description_text: List[str] = []
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Parse title and difficulty
+            if ". " in line and not current_section:
+                problem["title"] = line.split(". ", 1)[1]
+                logger.debug("Found title: %s", problem["title"])
+                continue
+            
+            # Classify the line once against the difficulty and every section header
+            match = SECTION_HEADER_RE.match(line)
+            header = match.lastgroup if match else None
+            header_end = match.end() if match else 0
+            
+            # Parse difficulty
+            if header == "difficulty":
+                problem["difficulty"] = line.lower()
+                logger.debug("Found difficulty: %s", problem["difficulty"])
+                continue
+            
+            # Parse topics
+            if header == "topics":
+                topics = line[header_end:].strip()
+                problem["topics"] = [t.strip() for t in topics.split(",")]
+                logger.debug("Found topics: %s", problem["topics"])
+                continue
+            
+            # Parse hint
+            if header == "hint":
+                problem["hint"] = line[header_end:].strip()
+                logger.debug("Found hint: %s", problem["hint"])
+                continue
+            
+            if header in ("description", "example", "constraints", "starter_code"):
+                if current_section == "description" and header != "description":
+                    problem["description"] = "\n".join(description_text).strip()
+                    logger.debug("Set description with %d lines", len(description_text))
+                
+                if header == "description":
+                    description_text = []
+                elif header == "example":
+                    if current_example and "input" in current_example and "output" in current_example:
+                        problem["examples"].append(current_example)
+                    current_example = {}
+                elif header == "constraints":
+                    problem["constraints"] = []
+                else:
+                    collect_starter_code = True
+                    starter_code_lines = []
+                
+                current_section = header
+                logger.debug("Found %s section", header)
+                continue
+                
+            if line == "```" and collect_starter_code:
+                collect_starter_code = False
+                continue
+                
+            # Handle content based on current section
+            if current_section == "description":
+                description_text.append(line)
+            elif current_section == "example":
+                field = EXAMPLE_FIELD_RE.match(line)
+                if field:
+                    current_example[field.group(1).lower()] = line[field.end():].strip()
+            elif current_section == "constraints":
+                problem["constraints"].append(line.lstrip("-*• ").strip())
+            elif current_section == "starter_code" and collect_starter_code:
+                if not line.startswith("```"):
+                    starter_code_lines.append(line)
+            # Also detect if any line is starter code (def or class)
+            elif line.startswith(("def ", "class ")):
+                if current_section != "starter_code":
+                    current_section = "starter_code"
+                    starter_code_lines = [line]
+                else:
+                    starter_code_lines.append(line)
+        
+        # Finalize description if we're still in that section
+        if current_section == "description":
+            problem["description"] = "\n".join(description_text).strip()
+            logger.debug("Set description with %d lines at the end", len(description_text))
+        
+        # Add the last example if exists
+        if current_example and "input" in current_example and "output" in current_example:
+            problem["examples"].append(current_example)
+            logger.debug("Added final example: %s", current_example)
+            
+        # Ensure we have at least one example
+        if not problem["examples"]:
+            problem["examples"].append({
+                "input": "sample input",
+                "output": "sample output"
+            })
+            logger.debug("Added default example")
+            
+        # Set the starter code, preferring the fenced python block with its indentation intact
+        python_code = extract_code_blocks(text).get("python")
+        if python_code:
+            problem["starterCode"] = python_code
+            logger.debug("Set starter code from the python code block")
+        elif starter_code_lines:
+            problem["starterCode"] = "\n".join(starter_code_lines)
+            logger.debug("Set starter code with %d lines", len(starter_code_lines))
+        else:
+            # Create a generic starter code if none was generated
+            function_name = "solve_problem"
+            if problem["title"]:
+                function_name = problem["title"].lower().replace(" ", "_").replace("-", "_")
+                function_name = ''.join(c for c in function_name if c.isalnum() or c == '_')
+            
+            problem["starterCode"] = f"""def {function_name}(input_data):
+    # TODO: Implement your solution here
+    pass"""
+            logger.debug("Created default starter code with function name: %s", function_name)
+        
+        logger.info("Final parsed problem: %s", problem["title"])
+        logger.debug("Description length: %d", len(problem["description"]))
+        logger.debug("Description preview: %s...", problem["description"][:100])
+        return problem
+                
+    except Exception:
+        logger.exception("Error parsing problem")
+        return None
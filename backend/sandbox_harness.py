@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Persistent sandbox worker for running submitted code against many test inputs.
+Usage: python3 sandbox_harness.py
+Reads one JSON request per line on stdin, {"code_path", "inputs", "timeout"}, and writes
+one JSON result per input on stdout, a line each, in input order and as soon as each input
+finishes. The worker stays warm between requests and
+never runs submitted code itself: each test input runs in a fresh forked child, so no
+state leaks between test cases or submissions.
+"""
+
+import atexit
+import builtins
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import types
+
+# Modules solutions commonly import, loaded once here so every forked child inherits them
+PRELOADED_MODULES = (
+    "array", "bisect", "collections", "functools", "heapq", "itertools",
+    "math", "re", "string", "typing"
+)
+for module_name in PRELOADED_MODULES:
+    __import__(module_name)
+
+# How often the parent checks whether a child has finished
+POLL_INTERVAL = 0.0005
+# ru_maxrss is in kilobytes on Linux but bytes on macOS
+MAXRSS_PER_KB = 1024 if sys.platform == "darwin" else 1
+
+def load_code(code_path):
+    """Compile the submitted code, or return the error to report in place of running it"""
+    try:
+        with open(code_path, "rb") as code_file:
+            return compile(code_file.read(), code_path, "exec"), None
+    except Exception as e:
+        return None, e
+
+def join_threads():
+    """Wait for the non-daemon threads the code started, including ones started while waiting"""
+    while True:
+        threads = [
+            thread for thread in threading.enumerate()
+            if thread is not threading.current_thread() and not thread.daemon
+        ]
+        if not threads:
+            return
+        for thread in threads:
+            thread.join()
+
+def run_child(code, compile_error, code_path):
+    """Run the code as __main__ in the forked child and return its exit status"""
+    # Match `python3 <code_path>`: the script's directory first on the path, fresh std streams
+    sys.argv = [code_path]
+    sys.path[0] = os.path.dirname(code_path)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+    
+    status = 0
+    try:
+        if compile_error:
+            traceback.print_exception(type(compile_error), compile_error, None)
+            status = 1
+        else:
+            # A real module registered as __main__, so pickle and friends can find what the script defines
+            main_module = types.ModuleType("__main__")
+            main_module.__file__ = code_path
+            main_module.__builtins__ = builtins
+            sys.modules["__main__"] = main_module
+            exec(code, main_module.__dict__)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # Leave the harness's own frame out of the traceback
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        status = 1
+    
+    # Like interpreter shutdown: wait for non-daemon threads, then run the atexit functions
+    join_threads()
+    atexit._run_exitfuncs()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return status
+
+def scratch_file():
+    """An anonymous in-memory file (memfd) where available, else an unlinked temporary file"""
+    if hasattr(os, "memfd_create"):
+        return open(os.memfd_create("sandbox"), "w+b")
+    return tempfile.TemporaryFile()
+
+def run_case(code, compile_error, code_path, test_input, timeout):
+    """Fork a child for one test input and collect its output within the timeout"""
+    with scratch_file() as stdin_file, scratch_file() as stdout_file, scratch_file() as stderr_file:
+        stdin_file.write(test_input.encode("utf-8"))
+        stdin_file.seek(0)
+        
+        start_time = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.dup2(stdin_file.fileno(), 0)
+                os.dup2(stdout_file.fileno(), 1)
+                os.dup2(stderr_file.fileno(), 2)
+                status = run_child(code, compile_error, code_path)
+            finally:
+                os._exit(status)
+        
+        # Poll so a runaway child can be killed at the deadline; wait4 also reports its resource usage
+        timed_out = False
+        while True:
+            done_pid, _, usage = os.wait4(pid, os.WNOHANG)
+            if done_pid:
+                break
+            if time.perf_counter() - start_time > timeout:
+                os.kill(pid, signal.SIGKILL)
+                _, _, usage = os.wait4(pid, 0)
+                timed_out = True
+                break
+            time.sleep(POLL_INTERVAL)
+        end_time = time.perf_counter()
+        
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        return {
+            "stdout": stdout_file.read().decode("utf-8", "replace"),
+            "stderr": stderr_file.read().decode("utf-8", "replace"),
+            "time": (end_time - start_time) * 1000,  # Convert to ms
+            "memory": usage.ru_maxrss / MAXRSS_PER_KB,  # Peak RSS of the child in KB
+            "timed_out": timed_out
+        }
+
+def main():
+    # Serve requests until the server closes our stdin
+    for line in sys.stdin.buffer:
+        request = json.loads(line)
+        code_path = request["code_path"]
+        
+        code, compile_error = load_code(code_path)
+        for test_input in request["inputs"]:
+            result = run_case(code, compile_error, code_path, test_input, request["timeout"])
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
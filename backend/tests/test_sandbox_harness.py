@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+HARNESS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sandbox_harness.py")
+
+@unittest.skipUnless(hasattr(os, "fork"), "the sandbox harness needs fork")
+class SandboxHarnessTest(unittest.TestCase):
+    """Submitted code must behave as it would under `python3 <file>`"""
+    
+    def run_code(self, code, inputs=("",), timeout=5):
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as code_file:
+            code_file.write(textwrap.dedent(code))
+        self.addCleanup(os.remove, code_file.name)
+        
+        request = {"code_path": code_file.name, "inputs": list(inputs), "timeout": timeout}
+        completed = subprocess.run(
+            [sys.executable, HARNESS],
+            input=json.dumps(request) + "\n",
+            capture_output=True,
+            text=True,
+            timeout=timeout * len(inputs) + 10
+        )
+        return [json.loads(line) for line in completed.stdout.splitlines()]
+    
+    def test_each_input_runs_separately(self):
+        results = self.run_code("""
+            import sys
+            print(int(sys.stdin.read()) * 2)
+        """, inputs=["2", "5"])
+        self.assertEqual([result["stdout"] for result in results], ["4\n", "10\n"])
+        self.assertFalse(any(result["timed_out"] for result in results))
+    
+    def test_classes_defined_in_main_can_be_pickled(self):
+        [result] = self.run_code("""
+            import pickle
+            class Point:
+                pass
+            print(type(pickle.loads(pickle.dumps(Point()))).__name__)
+        """)
+        self.assertEqual(result["stderr"], "")
+        self.assertEqual(result["stdout"], "Point\n")
+    
+    def test_non_daemon_threads_finish_before_exit(self):
+        [result] = self.run_code("""
+            import atexit
+            import threading
+            import time
+            
+            def later():
+                time.sleep(0.2)
+                print("thread done", flush=True)
+            
+            atexit.register(print, "atexit")
+            threading.Thread(target=later).start()
+            print("main done", flush=True)
+        """)
+        self.assertEqual(result["stdout"], "main done\nthread done\natexit\n")
+    
+    def test_errors_are_reported_without_the_harness_frame(self):
+        [result] = self.run_code("""
+            raise ValueError("bad input")
+        """)
+        self.assertIn("ValueError: bad input", result["stderr"])
+        self.assertNotIn("sandbox_harness", result["stderr"])
+    
+    def test_runaway_code_is_killed_at_the_timeout(self):
+        [result] = self.run_code("""
+            while True:
+                pass
+        """, timeout=0.5)
+        self.assertTrue(result["timed_out"])
+
+if __name__ == "__main__":
+    unittest.main()
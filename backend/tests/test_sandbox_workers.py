@@ -0,0 +1,73 @@
+import importlib.util
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Use a completion server URL so importing the app doesn't load the local model, and keep its tables in memory
+os.environ.setdefault("LLM_SERVER_URL", "http://127.0.0.1:9")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+class SlowEmptyQueue(queue.SimpleQueue):
+    """An idle-worker queue that widens the window between checking it and taking from it"""
+    
+    def empty(self):
+        result = super().empty()
+        time.sleep(0.1)
+        return result
+
+@unittest.skipUnless(hasattr(os, "fork"), "the sandbox harness needs fork")
+@unittest.skipUnless(importlib.util.find_spec("llama_cpp"), "the backend's dependencies are not installed")
+class SandboxWorkerPoolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, BACKEND)
+        global main
+        import main
+    
+    def setUp(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as code_file:
+            # Kills its own harness, so no batch ever hands a worker back to the idle queue
+            code_file.write("import os, signal\nos.kill(os.getppid(), signal.SIGKILL)\n")
+        self.addCleanup(os.remove, code_file.name)
+        self.code_path = code_file.name
+        
+        self.original_workers = main.idle_sandbox_workers
+        main.idle_sandbox_workers = SlowEmptyQueue()
+        self.addCleanup(setattr, main, "idle_sandbox_workers", self.original_workers)
+    
+    def tearDown(self):
+        while not main.idle_sandbox_workers.empty():
+            worker = main.idle_sandbox_workers.get()
+            main.kill_sandbox_worker(worker)
+            worker.stdin.close()
+            worker.stdout.close()
+    
+    def test_concurrent_batches_survive_a_dead_idle_worker(self):
+        dead_worker = subprocess.Popen([sys.executable, "-c", "pass"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        dead_worker.wait()
+        main.idle_sandbox_workers.put(dead_worker)
+        
+        outputs = {}
+        def run_batch(name):
+            outputs[name] = [result["output"] for result in main.execute_code_batch(self.code_path, [name])]
+        
+        batches = [threading.Thread(target=run_batch, args=(name,), daemon=True) for name in ("a", "b")]
+        for batch in batches:
+            batch.start()
+        for batch in batches:
+            batch.join(timeout=10)
+        
+        self.assertFalse(any(batch.is_alive() for batch in batches), "a batch blocked waiting for an idle worker")
+        self.assertEqual(sorted(outputs), ["a", "b"])
+        for output in outputs.values():
+            self.assertTrue(output[0].startswith("Error executing code"))
+
+if __name__ == "__main__":
+    unittest.main()
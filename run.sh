@@ -6,7 +6,7 @@ source venv/bin/activate
 python init_db.py
 
 # Start the backend server
-uvicorn main:app --reload &
+uvicorn main:app --reload --loop uvloop --http httptools &
 BACKEND_PID=$!
 
 # Function to handle cleanup